@@ -4,15 +4,99 @@ Advanced spam detection with phishing analysis and AI explanations
 """
 
 import streamlit as st
-import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 import re
 
 # Import modules
-from predictor import SpamPredictor
-from phishing_detector import PhishingDetector
-from explainability import SpamExplainer
+from predictor import SpamPredictor, BatchPredictor
+
+
+# Static stylesheet
+CSS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'app.css')
+
+# URL pattern used for the text statistics
+_URL_RE = re.compile(r'https?://[^\s<>"\']+')
+
+# Risk level colors for the phishing panel
+_RISK_COLOR = {'Low': '#4CAF50', 'Medium': '#FF9800', 'High': '#D32F2F'}
+_RISK_BG = {'Low': '#E8F5E9', 'Medium': '#FFF3E0', 'High': '#FFEBEE'}
+
+# Result panel templates
+_SPAM_BOX_HTML = """
+            <div class="spam-box">
+                <h2 style='margin: 0; color: #D32F2F;'>🚫 SPAM DETECTED</h2>
+                <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
+                    Confidence: {confidence:.2f}%
+                </p>
+                <p style='margin-top: 1rem; color: #555;'>
+                    ⚠️ This email appears to be spam. Exercise caution and avoid clicking any links.
+                </p>
+            </div>
+            """
+
+_HAM_BOX_HTML = """
+            <div class="ham-box">
+                <h2 style='margin: 0; color: #388E3C;'>✅ LEGITIMATE EMAIL</h2>
+                <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
+                    Confidence: {confidence:.2f}%
+                </p>
+                <p style='margin-top: 1rem; color: #555;'>
+                    ✓ This email appears to be legitimate communication.
+                </p>
+            </div>
+            """
+
+_PHISHING_BOX_HTML = """
+        <div style='padding: 1.5rem; border-radius: 10px; background-color: {risk_bg}; border: 2px solid {risk_color}'>
+            <h2 style='margin: 0;'>🔗 Phishing Risk Analysis</h2>
+            <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
+                Risk Score: {score:.1f}/100
+            </p>
+            <p style='color: {risk_color}; font-size: 1.2rem; font-weight: bold; margin-top: 0.5rem;'>
+                ⚠️ {risk_level} Risk Level
+            </p>
+            <p style='margin-top: 1rem; color: #555;'>
+                {explanation}
+            </p>
+        </div>
+        """
+
+# Session analysis history columns
+_HISTORY_DTYPES = {
+    'history_timestamp': 'datetime64[us]',
+    'history_is_spam': np.bool_,
+    'history_confidence': np.float32,
+    'history_phishing_score': np.float32
+}
+_HISTORY_INITIAL_CAPACITY = 16
+
+# Sidebar example emails
+_SPAM_EXAMPLE = """URGENT WINNER NOTIFICATION!
+                
+Congratulations! You've been selected to receive a $5,000 cash prize and a FREE iPhone 15 Pro Max!
+
+To claim your reward, click here immediately: http://bit.ly/claim-prize-now
+
+This offer expires in 24 hours! Act now before it's too late!
+
+Call our hotline: 1-800-FAKE-NUM
+Reference Code: WIN5000XYZ
+
+Don't miss this once-in-a-lifetime opportunity!"""
+
+_HAM_EXAMPLE = """Hi Sarah,
+
+Just wanted to confirm our meeting tomorrow at 3 PM at the downtown Starbucks. I'll bring the project documents we discussed.
+
+Let me know if you need to reschedule or if there's anything specific you'd like me to prepare.
+
+Looking forward to catching up!
+
+Best regards,
+Mike"""
 
 
 # Page configuration
@@ -24,87 +108,14 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
-    <style>
-    .main {
-        padding: 2rem;
-    }
-    .stButton>button {
-        width: 100%;
-        background-color: #FF4B4B;
-        color: white;
-        font-weight: bold;
-        padding: 0.75rem;
-        border-radius: 10px;
-        border: none;
-        font-size: 1.1rem;
-        transition: all 0.3s ease;
-    }
-    .stButton>button:hover {
-        background-color: #FF6B6B;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(255, 75, 75, 0.3);
-    }
-    .spam-box {
-        padding: 1.5rem;
-        border-radius: 10px;
-        background-color: #FFE5E5;
-        border-left: 5px solid #FF4B4B;
-        margin: 1rem 0;
-        animation: slideIn 0.3s ease;
-    }
-    .ham-box {
-        padding: 1.5rem;
-        border-radius: 10px;
-        background-color: #E5F5E5;
-        border-left: 5px solid #4CAF50;
-        margin: 1rem 0;
-        animation: slideIn 0.3s ease;
-    }
-    .phishing-box {
-        padding: 1rem;
-        border-radius: 10px;
-        background-color: #f0f2f6;
-        border: 2px solid #ddd;
-    }
-    .feature-card {
-        padding: 1.5rem;
-        border-radius: 10px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        text-align: center;
-        margin: 0.5rem 0;
-    }
-    .metric-card {
-        padding: 1rem;
-        border-radius: 8px;
-        background-color: #f8f9fa;
-        border-left: 4px solid #FF4B4B;
-    }
-    @keyframes slideIn {
-        from {
-            opacity: 0;
-            transform: translateY(20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    .highlight-word {
-        background-color: #FFE5E5;
-        padding: 2px 6px;
-        border-radius: 4px;
-        font-weight: bold;
-        color: #D32F2F;
-    }
-    .stExpander {
-        border: 1px solid #e0e0e0;
-        border-radius: 8px;
-        margin: 0.5rem 0;
-    }
-    </style>
-""", unsafe_allow_html=True)
+@st.cache_data
+def _css():
+    """Read the app stylesheet (cached)"""
+    with open(CSS_FILE, encoding='utf-8') as f:
+        return f.read()
+
+
+st.markdown(f"<style>{_css()}</style>", unsafe_allow_html=True)
 
 
 # Initialize session state
@@ -114,35 +125,93 @@ def load_predictor():
     return SpamPredictor()
 
 
+@st.cache_resource
+def load_batch_predictor():
+    """Load batching wrapper shared by all sessions (cached)"""
+    return BatchPredictor(load_predictor())
+
+
+@st.cache_resource
+def load_phishing_detector():
+    """Load phishing detector (cached, imported on first analysis)"""
+    from phishing_detector import PhishingDetector
+    return PhishingDetector()
+
+
+@st.cache_resource
+def load_explainer(_model, _vectorizer):
+    """Load spam explainer (cached, imported on first analysis, model/vectorizer are not hashed)"""
+    from explainability import SpamExplainer
+    return SpamExplainer(_model, _vectorizer)
+
+
 def init_session_state():
     """Initialize all session state variables"""
     if 'predictor' not in st.session_state:
         st.session_state.predictor = load_predictor()
     
-    if 'phishing_detector' not in st.session_state:
-        st.session_state.phishing_detector = PhishingDetector()
-    
-    if 'explainer' not in st.session_state:
-        if st.session_state.predictor.is_loaded():
-            model, vectorizer = st.session_state.predictor.get_model_and_vectorizer()
-            st.session_state.explainer = SpamExplainer(model, vectorizer)
-        else:
-            st.session_state.explainer = None
-    
     if 'example_text' not in st.session_state:
         st.session_state.example_text = ''
     
-    if 'analysis_history' not in st.session_state:
-        st.session_state.analysis_history = []
+    # Analysis history kept as parallel arrays, total_analyzed rows are used
+    for key, dtype in _HISTORY_DTYPES.items():
+        if key not in st.session_state:
+            st.session_state[key] = np.empty(_HISTORY_INITIAL_CAPACITY, dtype=dtype)
+    
+    if 'total_analyzed' not in st.session_state:
+        st.session_state.total_analyzed = 0
+    
+    if 'spam_total' not in st.session_state:
+        st.session_state.spam_total = 0
+
+
+def record_analysis(prediction, confidence, phishing_score):
+    """
+    Append one analysis to the session history arrays
+    
+    Args:
+        prediction (str): 'spam' or 'ham'
+        confidence (float): Prediction confidence
+        phishing_score (float): Phishing risk score
+    """
+    state = st.session_state
+    row = state.total_analyzed
+    
+    # Double capacity when full
+    if row == len(state.history_is_spam):
+        for key in _HISTORY_DTYPES:
+            state[key] = np.concatenate([state[key], np.empty_like(state[key])])
+    
+    state.history_timestamp[row] = np.datetime64(datetime.now(), 'us')
+    state.history_is_spam[row] = prediction == 'spam'
+    state.history_confidence[row] = confidence
+    state.history_phishing_score[row] = phishing_score
+    
+    # Running totals for the sidebar stats
+    state.total_analyzed += 1
+    if prediction == 'spam':
+        state.spam_total += 1
+
+
+def _feature_summary(vectorizer):
+    """Describe the loaded vectorizer's features for the sidebar"""
+    vocabulary = getattr(vectorizer, 'vocabulary_', None)
+    if vocabulary is not None:
+        return f"{len(vocabulary):,} TF-IDF terms"
+    
+    # HashingVectorizer + TfidfTransformer pipeline from train_model.py
+    return f"TF-IDF over {vectorizer.steps[0][1].n_features:,} hashed word buckets"
 
 
 def render_sidebar():
     """Render sidebar content"""
+    _, vectorizer = st.session_state.predictor.get_model_and_vectorizer()
+    
     with st.sidebar:
         st.image("https://img.icons8.com/fluency/96/000000/spam.png", width=80)
         st.title("About")
         
-        st.markdown("""
+        st.markdown(f"""
         ### 🤖 AI Spam Classifier
         
         Advanced email security powered by machine learning and phishing detection.
@@ -150,7 +219,7 @@ def render_sidebar():
         **🎯 Model Performance:**
         - Algorithm: Multinomial Naive Bayes
         - Accuracy: ~97%
-        - Features: 3000 TF-IDF vectors
+        - Features: {_feature_summary(vectorizer)}
         - Dataset: SMS Spam Collection
         
         **🔍 Detection Methods:**
@@ -174,41 +243,21 @@ def render_sidebar():
         
         with col1:
             if st.button("🚫 Spam", use_container_width=True):
-                st.session_state.example_text = """URGENT WINNER NOTIFICATION!
-                
-Congratulations! You've been selected to receive a $5,000 cash prize and a FREE iPhone 15 Pro Max!
-
-To claim your reward, click here immediately: http://bit.ly/claim-prize-now
-
-This offer expires in 24 hours! Act now before it's too late!
-
-Call our hotline: 1-800-FAKE-NUM
-Reference Code: WIN5000XYZ
-
-Don't miss this once-in-a-lifetime opportunity!"""
+                st.session_state.example_text = _SPAM_EXAMPLE
                 st.rerun()
         
         with col2:
             if st.button("✅ Legit", use_container_width=True):
-                st.session_state.example_text = """Hi Sarah,
-
-Just wanted to confirm our meeting tomorrow at 3 PM at the downtown Starbucks. I'll bring the project documents we discussed.
-
-Let me know if you need to reschedule or if there's anything specific you'd like me to prepare.
-
-Looking forward to catching up!
-
-Best regards,
-Mike"""
+                st.session_state.example_text = _HAM_EXAMPLE
                 st.rerun()
         
         st.markdown("---")
         
         # Statistics
-        if len(st.session_state.analysis_history) > 0:
+        if st.session_state.total_analyzed > 0:
             st.header("📈 Your Stats")
-            total = len(st.session_state.analysis_history)
-            spam_count = sum(1 for x in st.session_state.analysis_history if x['prediction'] == 'spam')
+            total = st.session_state.total_analyzed
+            spam_count = st.session_state.spam_total
             
             st.metric("Total Analyzed", total)
             st.metric("Spam Detected", spam_count)
@@ -223,107 +272,153 @@ Mike"""
         st.markdown("- TF-IDF Vectorization")
 
 
-def display_classification_result(email_text, prediction, confidence, phishing_result, explanation):
+@st.cache_data(max_entries=1024, ttl=3600, show_spinner=False)
+def _analyze(email_text):
+    """
+    Run spam prediction, phishing detection and explanation (cached per text)
+    
+    Args:
+        email_text (str): Email content
+        
+    Returns:
+        tuple: (preprocessed, prediction, confidence, phishing_result, explanation)
+    """
+    predictor = load_predictor()
+    
+    # Preprocess once, reused by prediction and the technical analysis
+    preprocessed = predictor.preprocess_text(email_text)
+    
+    # Spam prediction and phishing detection are independent, run them together
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prediction_future = executor.submit(
+            load_batch_predictor().predict, email_text, processed_text=preprocessed
+        )
+        phishing_future = executor.submit(load_phishing_detector().analyze_email, email_text)
+        
+        prediction, confidence = prediction_future.result()
+        phishing_result = phishing_future.result()
+    
+    # Get explanation
+    explanation = None
+    if predictor.is_loaded():
+        model, vectorizer = predictor.get_model_and_vectorizer()
+        explanation = load_explainer(model, vectorizer).explain_prediction(
+            email_text, prediction, confidence, processed_text=preprocessed
+        )
+    
+    return preprocessed, prediction, confidence, phishing_result, explanation
+
+
+def _text_stats(text):
+    """
+    Compute text statistics for the technical analysis panel
+    
+    Args:
+        text (str): Email text
+        
+    Returns:
+        tuple: (characters, words, lines, url_count)
+    """
+    # str methods and the compiled regex each scan in C, which beats a
+    # hand-written per-character loop in Python
+    if not text:
+        return 0, 0, 0, 0
+    
+    # Count newlines instead of building the splitlines() list
+    lines = text.count('\n') + (0 if text.endswith('\n') else 1)
+    
+    return (
+        len(text),
+        len(text.split()),
+        lines,
+        sum(1 for _ in _URL_RE.finditer(text))
+    )
+
+
+def display_classification_result(email_text, prediction, confidence, phishing_result, explanation,
+                                  preprocessed=None):
     """Display comprehensive classification results"""
     
-    st.markdown("---")
-    st.markdown("## 📊 Analysis Results")
+    st.markdown("---\n\n## 📊 Analysis Results")
     
     # Main results in two columns
     col_spam, col_phishing = st.columns(2)
     
     with col_spam:
-        if prediction == 'spam':
-            st.markdown(f"""
-            <div class="spam-box">
-                <h2 style='margin: 0; color: #D32F2F;'>🚫 SPAM DETECTED</h2>
-                <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
-                    Confidence: {confidence:.2f}%
-                </p>
-                <p style='margin-top: 1rem; color: #555;'>
-                    ⚠️ This email appears to be spam. Exercise caution and avoid clicking any links.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="ham-box">
-                <h2 style='margin: 0; color: #388E3C;'>✅ LEGITIMATE EMAIL</h2>
-                <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
-                    Confidence: {confidence:.2f}%
-                </p>
-                <p style='margin-top: 1rem; color: #555;'>
-                    ✓ This email appears to be legitimate communication.
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Confidence meter
-        st.markdown("#### 📈 Confidence Level")
-        st.progress(confidence / 100)
+        result_box = _SPAM_BOX_HTML if prediction == 'spam' else _HAM_BOX_HTML
         
-        if confidence >= 90:
-            st.success("Very High Confidence")
-        elif confidence >= 70:
-            st.info("High Confidence")
-        elif confidence >= 50:
-            st.warning("Moderate Confidence")
-        else:
-            st.error("Low Confidence - Manual Review Recommended")
+        # Result box and confidence meter heading in one element
+        st.markdown(
+            result_box.format(confidence=confidence) + "\n\n#### 📈 Confidence Level",
+            unsafe_allow_html=True
+        )
+        # Meter and status share one slot so they are replaced together
+        confidence_slot = st.empty()
+        with confidence_slot.container():
+            st.progress(confidence / 100)
+            
+            if confidence >= 90:
+                st.success("Very High Confidence")
+            elif confidence >= 70:
+                st.info("High Confidence")
+            elif confidence >= 50:
+                st.warning("Moderate Confidence")
+            else:
+                st.error("Low Confidence - Manual Review Recommended")
     
     with col_phishing:
-        risk_color = {'Low': '#4CAF50', 'Medium': '#FF9800', 'High': '#D32F2F'}
-        risk_bg = {'Low': '#E8F5E9', 'Medium': '#FFF3E0', 'High': '#FFEBEE'}
+        risk_level = phishing_result['risk_level']
         
-        st.markdown(f"""
-        <div style='padding: 1.5rem; border-radius: 10px; background-color: {risk_bg[phishing_result["risk_level"]]}; border: 2px solid {risk_color[phishing_result["risk_level"]]}'>
-            <h2 style='margin: 0;'>🔗 Phishing Risk Analysis</h2>
-            <p style='font-size: 1.3rem; margin-top: 0.5rem; font-weight: bold;'>
-                Risk Score: {phishing_result['phishing_score']:.1f}/100
-            </p>
-            <p style='color: {risk_color[phishing_result['risk_level']]}; font-size: 1.2rem; font-weight: bold; margin-top: 0.5rem;'>
-                ⚠️ {phishing_result['risk_level']} Risk Level
-            </p>
-            <p style='margin-top: 1rem; color: #555;'>
-                {phishing_result['explanation']}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown(f"**URLs Found:** {phishing_result['url_count']}")
+        parts = [
+            _PHISHING_BOX_HTML.format(
+                risk_bg=_RISK_BG[risk_level],
+                risk_color=_RISK_COLOR[risk_level],
+                score=phishing_result['phishing_score'],
+                risk_level=risk_level,
+                explanation=phishing_result['explanation']
+            ),
+            f"**URLs Found:** {phishing_result['url_count']}"
+        ]
         if phishing_result['suspicious_urls']:
-            st.markdown(f"**Suspicious URLs:** {len(phishing_result['suspicious_urls'])}")
+            parts.append(f"**Suspicious URLs:** {len(phishing_result['suspicious_urls'])}")
+        
+        st.markdown("\n\n".join(parts), unsafe_allow_html=True)
     
     # AI Explanation Section
     if explanation:
-        st.markdown("---")
-        st.markdown("## 🧠 AI Explanation: Why This Classification?")
+        st.markdown("---\n\n## 🧠 AI Explanation: Why This Classification?")
         
         st.info(f"**{explanation['explanation']}**")
         
         # Show suspicious words with highlighting
         if explanation['suspicious_words']:
-            st.markdown("### 🔍 Key Spam Indicators")
-            
             # Display highlighted words
             highlighted_words = ' '.join([
                 f'<span class="highlight-word">{word}</span>' 
                 for word in explanation['suspicious_words']
             ])
-            st.markdown(f"**Detected Keywords:** {highlighted_words}", unsafe_allow_html=True)
+            st.markdown(
+                f"### 🔍 Key Spam Indicators\n\n**Detected Keywords:** {highlighted_words}",
+                unsafe_allow_html=True
+            )
         
         # Detailed feature analysis
         with st.expander("📊 Detailed Feature Analysis", expanded=False):
             st.markdown("**Top Contributing Features:**")
             
             if explanation['top_features']:
-                # Create DataFrame for better visualization
-                features_df = pd.DataFrame(explanation['top_features'][:10])
-                features_df['contribution'] = features_df['contribution'].round(6)
-                features_df['tfidf_score'] = features_df['tfidf_score'].round(6)
+                # Plain rows are enough for a 10-row table
+                feature_rows = [
+                    {
+                        'word': f['word'],
+                        'contribution': round(f['contribution'], 6),
+                        'tfidf_score': round(f['tfidf_score'], 6)
+                    }
+                    for f in explanation['top_features'][:10]
+                ]
                 
                 st.dataframe(
-                    features_df,
+                    feature_rows,
                     column_config={
                         "word": "Word/Feature",
                         "contribution": st.column_config.NumberColumn(
@@ -346,81 +441,61 @@ def display_classification_result(email_text, prediction, confidence, phishing_r
         with st.expander("⚠️ Phishing Analysis Details", expanded=phishing_result['risk_level'] == 'High'):
             
             if phishing_result['indicators']:
-                st.markdown("**🚨 Security Risk Indicators:**")
-                for i, indicator in enumerate(phishing_result['indicators'], 1):
-                    st.markdown(f"{i}. {indicator}")
+                indicator_lines = [
+                    f"{i}. {indicator}"
+                    for i, indicator in enumerate(phishing_result['indicators'], 1)
+                ]
+                st.markdown("**🚨 Security Risk Indicators:**\n\n" + "\n".join(indicator_lines))
             
             if phishing_result['suspicious_urls']:
-                st.markdown("---")
-                st.markdown("**🔗 Suspicious URLs Detected:**")
+                st.markdown("---\n\n**🔗 Suspicious URLs Detected:**")
                 
                 for idx, url_data in enumerate(phishing_result['suspicious_urls'], 1):
                     st.markdown(f"**URL #{idx}:**")
                     st.code(url_data['url'], language=None)
                     
-                    st.markdown("**Why it's suspicious:**")
-                    for reason in url_data['reasons']:
-                        st.markdown(f"- ⚠️ {reason}")
-                    
-                    st.markdown("---")
+                    reason_lines = [f"- ⚠️ {reason}" for reason in url_data['reasons']]
+                    st.markdown("**Why it's suspicious:**\n\n" + "\n".join(reason_lines) + "\n\n---")
     
     # Technical Details
     with st.expander("🔬 Technical Analysis", expanded=False):
         col_tech1, col_tech2 = st.columns(2)
         
         with col_tech1:
-            st.markdown("**Text Statistics:**")
-            st.write(f"- Characters: {len(email_text)}")
-            st.write(f"- Words: {len(email_text.split())}")
-            st.write(f"- Lines: {len(email_text.splitlines())}")
+            chars, words, lines, url_count = _text_stats(email_text)
             
-            # Count URLs
-            url_pattern = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
-            urls = url_pattern.findall(email_text)
-            st.write(f"- URLs: {len(urls)}")
+            st.markdown(
+                "**Text Statistics:**\n\n"
+                f"- Characters: {chars}\n"
+                f"- Words: {words}\n"
+                f"- Lines: {lines}\n"
+                f"- URLs: {url_count}"
+            )
         
         with col_tech2:
-            st.markdown("**Classification Details:**")
-            st.write(f"- Prediction: **{prediction.upper()}**")
-            st.write(f"- ML Confidence: **{confidence:.4f}%**")
-            st.write(f"- Phishing Score: **{phishing_result['phishing_score']:.2f}/100**")
-            st.write(f"- Risk Level: **{phishing_result['risk_level']}**")
+            st.markdown(
+                "**Classification Details:**\n\n"
+                f"- Prediction: **{prediction.upper()}**\n"
+                f"- ML Confidence: **{confidence:.4f}%**\n"
+                f"- Phishing Score: **{phishing_result['phishing_score']:.2f}/100**\n"
+                f"- Risk Level: **{phishing_result['risk_level']}**"
+            )
         
         st.markdown("**Preprocessed Text Preview:**")
-        preprocessed = st.session_state.predictor.preprocess_text(email_text)
+        if preprocessed is None:
+            preprocessed = st.session_state.predictor.preprocess_text(email_text)
         preview_length = min(300, len(preprocessed))
         st.code(preprocessed[:preview_length] + ("..." if len(preprocessed) > preview_length else ""), language=None)
 
 
-def main():
-    """Main application"""
-    
-    # Initialize session state
-    init_session_state()
-    
-    # Check if predictor loaded
-    if not st.session_state.predictor.is_loaded():
-        st.error("⚠️ Model failed to load. Please refresh the page or contact support.")
-        st.stop()
-    
-    # Render sidebar
-    render_sidebar()
-    
-    # Main header
-    st.markdown("""
-    <div style='text-align: center; padding: 2rem 0;'>
-        <h1 style='font-size: 3rem; margin: 0;'>🤖 AI Spam Email Classifier ( Demo Version )</h1>
-        <p style='font-size: 1.3rem; color: #666; margin-top: 0.5rem;'>
-            Advanced ML-Powered Email Security Analysis
-        </p>
-        <p style='color: rgb(255, 75, 75); font-size: 0.9rem;'>
-            🎯 97% Accuracy | 🔍 Phishing Detection | 🧠 AI Explanations | ⚡ Real-time Analysis
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("---")
+@st.fragment
+def render_analysis_section():
+    """
+    Render email input, action buttons and results
     
+    Runs as a fragment so typing and clicking Analyze only rerun this
+    section, not the sidebar, header, feature cards and footer.
+    """
     # Main input section
     st.markdown("## 📝 Enter Email Content")
     
@@ -459,26 +534,10 @@ Include both subject and body for best results.""",
             st.warning("⚠️ Please enter some text to analyze!")
         else:
             with st.spinner("🤖 Running comprehensive analysis..."):
-                # Spam prediction
-                prediction, confidence = st.session_state.predictor.predict(email_text)
-                
-                # Phishing detection
-                phishing_result = st.session_state.phishing_detector.analyze_email(email_text)
-                
-                # Get explanation
-                explanation = None
-                if st.session_state.explainer:
-                    explanation = st.session_state.explainer.explain_prediction(
-                        email_text, prediction, confidence
-                    )
+                preprocessed, prediction, confidence, phishing_result, explanation = _analyze(email_text)
                 
                 # Store in history
-                st.session_state.analysis_history.append({
-                    'timestamp': datetime.now(),
-                    'prediction': prediction,
-                    'confidence': confidence,
-                    'phishing_score': phishing_result['phishing_score']
-                })
+                record_analysis(prediction, confidence, phishing_result['phishing_score'])
                 
                 # Display results
                 display_classification_result(
@@ -486,8 +545,42 @@ Include both subject and body for best results.""",
                     prediction, 
                     confidence, 
                     phishing_result, 
-                    explanation
+                    explanation,
+                    preprocessed=preprocessed
                 )
+
+
+def main():
+    """Main application"""
+    
+    # Initialize session state
+    init_session_state()
+    
+    # Check if predictor loaded
+    if not st.session_state.predictor.is_loaded():
+        st.error("⚠️ Model failed to load. Please refresh the page or contact support.")
+        st.stop()
+    
+    # Render sidebar
+    render_sidebar()
+    
+    # Main header
+    st.markdown("""
+    <div style='text-align: center; padding: 2rem 0;'>
+        <h1 style='font-size: 3rem; margin: 0;'>🤖 AI Spam Email Classifier ( Demo Version )</h1>
+        <p style='font-size: 1.3rem; color: #666; margin-top: 0.5rem;'>
+            Advanced ML-Powered Email Security Analysis
+        </p>
+        <p style='color: rgb(255, 75, 75); font-size: 0.9rem;'>
+            🎯 97% Accuracy | 🔍 Phishing Detection | 🧠 AI Explanations | ⚡ Real-time Analysis
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    # Input and analysis (reruns on its own, see render_analysis_section)
+    render_analysis_section()
     
     # Features showcase
     st.markdown("---")
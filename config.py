@@ -2,20 +2,20 @@
 Configuration settings for Gmail Spam Classifier
 """
 
-import os
+from pathlib import Path
 
 # Project paths
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CREDENTIALS_DIR = os.path.join(BASE_DIR, 'credentials')
-MODELS_DIR = os.path.join(BASE_DIR, 'models')
+BASE_DIR = Path(__file__).resolve().parent
+CREDENTIALS_DIR = BASE_DIR / 'credentials'
+MODELS_DIR = BASE_DIR / 'models'
 
 # OAuth credentials
-CREDENTIALS_FILE = os.path.join(CREDENTIALS_DIR, 'credentials.json')
-TOKEN_FILE = os.path.join(CREDENTIALS_DIR, 'token.json')
+CREDENTIALS_FILE = CREDENTIALS_DIR / 'credentials.json'
+TOKEN_FILE = CREDENTIALS_DIR / 'token.json'
 
 # Model files
-MODEL_FILE = os.path.join(MODELS_DIR, 'model.pkl')
-VECTORIZER_FILE = os.path.join(MODELS_DIR, 'vectorizer.pkl')
+MODEL_FILE = MODELS_DIR / 'model.pkl'
+VECTORIZER_FILE = MODELS_DIR / 'vectorizer.pkl'
 
 # Gmail API settings
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
@@ -23,6 +23,10 @@ SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 # EMAIL FETCHING SETTINGS - UPDATED
 MAX_EMAILS = 500  # Maximum emails to fetch (increased from 20)
 BATCH_SIZE = 100  # Number of emails per API request (Gmail max is 500, but 100 is safer)
+DETAIL_BATCH_SIZE = 50  # Message fetches per batch HTTP request (Gmail allows 100, recommends 50)
+
+# MONITORING SETTINGS
+MAX_ALERTS = 1000  # Alerts kept in memory by the notifier; oldest are dropped first
 
 # FOLDER/LABEL SETTINGS - NEW
 # Fetch from all folders to include spam emails that Gmail already filtered
@@ -43,5 +47,6 @@ TRACK_LABELS = [
 ]
 
 # Create credentials directory if it doesn't exist
-os.makedirs(CREDENTIALS_DIR, exist_ok=True)
-os.makedirs(MODELS_DIR, exist_ok=True)
\ No newline at end of file
+for _directory in (CREDENTIALS_DIR, MODELS_DIR):
+    if not _directory.exists():
+        _directory.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
@@ -3,10 +3,19 @@ ML Model Explainability Module
 Explains why an email was classified as spam
 """
 
+import re
+from functools import lru_cache
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 
+@lru_cache(maxsize=128)
+def _highlight_pattern(words):
+    """Compile one alternation for a set of words (longest first)"""
+    ordered = sorted(words, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(word) for word in ordered), re.IGNORECASE)
+
+
 class SpamExplainer:
     """Explains spam classification decisions"""
     
@@ -16,13 +25,23 @@ class SpamExplainer:
         
         Args:
             model: Trained Naive Bayes model
-            vectorizer: Fitted TfidfVectorizer
+            vectorizer: Fitted TfidfVectorizer, or HashingVectorizer + TfidfTransformer pipeline
         """
         self.model = model
         self.vectorizer = vectorizer
-        self.feature_names = vectorizer.get_feature_names_out()
+        
+        # Per-class feature probabilities, fixed after training
+        self._class_probs = np.exp(model.feature_log_prob_)
+        
+        try:
+            self.feature_names = vectorizer.get_feature_names_out()
+            self.hasher = None
+        except AttributeError:
+            # Hashed features have no vocabulary, words are recovered per text
+            self.feature_names = None
+            self.hasher = vectorizer.steps[0][1]
     
-    def explain_prediction(self, text, prediction, confidence):
+    def explain_prediction(self, text, prediction, confidence, processed_text=None):
         """
         Generate explanation for spam prediction
         
@@ -30,15 +49,61 @@ class SpamExplainer:
             text (str): Original email text
             prediction (str): 'spam' or 'ham'
             confidence (float): Prediction confidence
+            processed_text (str): Output of SpamPredictor.preprocess_text(text),
+                                  what the model was trained on (optional)
             
         Returns:
             dict: Explanation details
         """
+        # The hashed vectorizer keeps every raw token (stopwords, unstemmed
+        # words), so explain the same preprocessed text the model scored
+        if processed_text is not None:
+            text = processed_text
+        
         # Get TF-IDF features
         tfidf_vector = self.vectorizer.transform([text])
+        row = tfidf_vector.tocsr()
         
+        return self._explain_row(text, row.data, row.indices, prediction, confidence)
+    
+    def explain_batch(self, texts, predictions, confidences, processed_texts=None):
+        """
+        Generate explanations for several emails with one vectorizer pass
+        
+        Args:
+            texts (list): Original email texts
+            predictions (list): 'spam' or 'ham' for each text
+            confidences (list): Prediction confidence for each text
+            processed_texts (list): preprocess_text() output for each text (optional)
+            
+        Returns:
+            list: Explanation details, in texts order
+        """
+        if not texts:
+            return []
+        
+        if processed_texts is not None:
+            texts = processed_texts
+        
+        # Get TF-IDF features for every text at once, then slice rows out of the CSR arrays
+        tfidf_matrix = self.vectorizer.transform(texts).tocsr()
+        data, indices, indptr = tfidf_matrix.data, tfidf_matrix.indices, tfidf_matrix.indptr
+        
+        return [
+            self._explain_row(text, data[indptr[i]:indptr[i + 1]], indices[indptr[i]:indptr[i + 1]],
+                              prediction, confidence)
+            for i, (text, prediction, confidence) in enumerate(zip(texts, predictions, confidences))
+        ]
+    
+    def _explain_row(self, text, tfidf_scores, indices, prediction, confidence):
+        """Build the explanation dict for one text from its non-zero TF-IDF entries"""
         # Get top contributing features
-        top_features = self._get_top_features(tfidf_vector, prediction, n=10)
+        feature_names = self.feature_names
+        if feature_names is None:
+            feature_names = self._hashed_feature_names(text)
+        
+        top_features = self._top_features_from_csr(tfidf_scores, indices, prediction, n=10,
+                                                   feature_names=feature_names)
         
         # Generate human explanation
         explanation = self._generate_explanation(prediction, confidence, top_features)
@@ -53,52 +118,74 @@ class SpamExplainer:
             'confidence_reasoning': self._explain_confidence(confidence)
         }
     
-    def _get_top_features(self, tfidf_vector, prediction, n=10):
+    def _hashed_feature_names(self, text):
+        """
+        Map hashed feature indices back to the words of text
+        
+        Args:
+            text (str): Original email text
+            
+        Returns:
+            dict: Feature index -> word ('a/b' when words collide)
+        """
+        words = sorted(set(self.hasher.build_analyzer()(text)))
+        if not words:
+            return {}
+        
+        # One row per word, each with exactly one non-zero column
+        indices = self.hasher.transform(words).indices
+        
+        names = {}
+        for idx, word in zip(indices, words):
+            names[idx] = f"{names[idx]}/{word}" if idx in names else word
+        return names
+    
+    def _top_features_from_csr(self, tfidf_scores, indices, prediction, n=10, feature_names=None):
         """
-        Get top N features contributing to prediction
+        Get top N features from one CSR row's data and indices arrays
         
         Args:
-            tfidf_vector: TF-IDF vector of the text
+            tfidf_scores: Non-zero TF-IDF values of the row
+            indices: Feature indices of those values
             prediction: Predicted class
             n: Number of top features
+            feature_names: Index -> word mapping (defaults to the vocabulary)
             
         Returns:
             list: Top contributing features
         """
+        if feature_names is None:
+            feature_names = self.feature_names
+        
         # Get feature importances from the model
         if prediction == 'spam':
-            # Log probabilities for spam class
-            feature_log_prob = self.model.feature_log_prob_[1]
+            # Probabilities for spam class
+            feature_prob = self._class_probs[1]
         else:
-            # Log probabilities for ham class
-            feature_log_prob = self.model.feature_log_prob_[0]
+            # Probabilities for ham class
+            feature_prob = self._class_probs[0]
         
-        # Get non-zero features from the text
-        non_zero_indices = tfidf_vector.nonzero()[1]
-        
-        if len(non_zero_indices) == 0:
+        if tfidf_scores.size == 0:
             return []
         
-        # Calculate contribution scores
-        contributions = []
-        for idx in non_zero_indices:
-            word = self.feature_names[idx]
-            tfidf_score = tfidf_vector[0, idx]
-            log_prob = feature_log_prob[idx]
-            
-            # Contribution = TF-IDF score * log probability
-            contribution = tfidf_score * np.exp(log_prob)
-            
-            contributions.append({
-                'word': word,
-                'contribution': float(contribution),
-                'tfidf_score': float(tfidf_score)
-            })
+        # Contribution = TF-IDF score * probability, for all features at once
+        contributions = tfidf_scores * feature_prob[indices]
         
-        # Sort by contribution
-        contributions.sort(key=lambda x: x['contribution'], reverse=True)
+        # Top N by contribution, highest first
+        k = min(n, contributions.size)
+        top = np.argpartition(-contributions, k - 1)[:k]
+        top = top[np.argsort(-contributions[top], kind='stable')]
         
-        return contributions[:n]
+        return [
+            {
+                'word': feature_names[idx],
+                'contribution': float(contribution),
+                'tfidf_score': float(tfidf_score)
+            }
+            for idx, contribution, tfidf_score in zip(
+                indices[top], contributions[top], tfidf_scores[top]
+            )
+        ]
     
     def _generate_explanation(self, prediction, confidence, top_features):
         """Generate human-readable explanation"""
@@ -149,14 +236,13 @@ class SpamExplainer:
         Returns:
             str: Text with HTML highlighting
         """
-        highlighted = text
-        
-        for word in suspicious_words:
-            # Case-insensitive replacement
-            pattern = re.compile(re.escape(word), re.IGNORECASE)
-            highlighted = pattern.sub(
-                f'<mark style="background-color: #FFE5E5; padding: 2px 4px; border-radius: 3px;">{word}</mark>',
-                highlighted
-            )
+        words = frozenset(word for word in suspicious_words if word)
+        if not words:
+            return text
         
-        return highlighted
\ No newline at end of file
+        # Single case-insensitive pass, keeping the casing found in the text
+        pattern = _highlight_pattern(words)
+        return pattern.sub(
+            lambda match: f'<mark style="background-color: #FFE5E5; padding: 2px 4px; border-radius: 3px;">{match.group(0)}</mark>',
+            text
+        )
@@ -9,8 +9,30 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
 import config
 
+# Optional: orjson parses the (large, base64-heavy) API responses much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel that deserializes responses with orjson"""
+    
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Not JSON; let JsonModel return it as-is
+            return super().deserialize(content)
+        
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
 
 class GmailAuthenticator:
     """Handles Gmail OAuth2 authentication"""
@@ -69,7 +91,8 @@ class GmailAuthenticator:
         
         # Build Gmail service
         try:
-            self.service = build('gmail', 'v1', credentials=self.creds)
+            model = _OrjsonModel() if orjson else None
+            self.service = build('gmail', 'v1', credentials=self.creds, model=model)
             return True, "Authentication successful"
         except Exception as e:
             return False, f"Failed to build Gmail service: {str(e)}"
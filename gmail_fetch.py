@@ -3,16 +3,49 @@ Gmail Email Fetcher - PRODUCTION VERSION
 Fetches and parses emails from Gmail API with full pagination and all folders
 """
 
-import base64
+import html
 import re
+from collections import Counter
 from email.mime.text import MIMEText
-from bs4 import BeautifulSoup
+import lxml.html
 import config
 
+# Optional: pybase64 is a SIMD-accelerated drop-in for the stdlib decoder
+try:
+    from pybase64 import urlsafe_b64decode as _b64decode
+except ImportError:
+    from base64 import urlsafe_b64decode as _b64decode
+
+
+# Body cleanup patterns
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Stand-in for parts whose 'body' was trimmed from the response
+_EMPTY_BODY = {}
+
+# Headers read from each message
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+# Response fields needed to parse a full message (drops raw sizes, attachment ids, etc.)
+FULL_MESSAGE_FIELDS = 'id,labelIds,snippet,payload(mimeType,headers,body/data,parts(mimeType,body/data,parts))'
+
+
+def _decode_part_data(data):
+    """Decode a base64url message part body to text"""
+    return _b64decode(data).decode('utf-8', errors='ignore')
+
 
 class GmailFetcher:
     """Fetches emails from Gmail using authenticated service with pagination"""
     
+    # Folder labels, highest priority first
+    FOLDER_PRIORITY = ('SPAM', 'INBOX', 'IMPORTANT', 'SENT', 'DRAFT')
+    
+    # Category labels
+    CATEGORY_PREFIX = 'CATEGORY_'
+    LEGACY_CATEGORIES = ('PROMOTIONS', 'SOCIAL', 'FORUMS', 'UPDATES')
+    
     def __init__(self, service):
         """
         Initialize fetcher with Gmail service
@@ -22,7 +55,7 @@ class GmailFetcher:
         """
         self.service = service
     
-    def fetch_recent_emails(self, max_results=None, progress_callback=None):
+    def fetch_recent_emails(self, max_results=None, progress_callback=None, light=False):
         """
         Fetch recent emails from ALL folders (including SPAM) with pagination
         
@@ -30,6 +63,7 @@ class GmailFetcher:
             max_results (int): Maximum number of emails to fetch
             progress_callback (callable): Optional callback function for progress updates
                                          Called with (current_count, total_fetched, status_message)
+            light (bool): Use Gmail's snippet as the body instead of fetching it
         
         Returns:
             list: List of email dictionaries
@@ -70,21 +104,17 @@ class GmailFetcher:
                     # No more messages
                     break
                 
-                # Fetch full message details for this batch
-                for idx, msg in enumerate(messages):
-                    email_data = self._get_email_details(msg['id'])
-                    
-                    if email_data:
-                        all_emails.append(email_data)
-                        total_fetched += 1
-                        
-                        # Update progress every 10 emails
-                        if progress_callback and (total_fetched % 10 == 0 or total_fetched == max_results):
-                            progress_callback(
-                                total_fetched, 
-                                max_results, 
-                                f"Processing email {total_fetched}/{max_results}..."
-                            )
+                # Fetch full message details for this batch (few HTTP round trips)
+                email_batch = self._get_email_details_batch([msg['id'] for msg in messages], light)
+                all_emails.extend(email_batch)
+                total_fetched += len(email_batch)
+                
+                if progress_callback:
+                    progress_callback(
+                        total_fetched, 
+                        max_results, 
+                        f"Processing email {total_fetched}/{max_results}..."
+                    )
                 
                 # Check if there's a next page
                 page_token = results.get('nextPageToken')
@@ -105,37 +135,127 @@ class GmailFetcher:
                 progress_callback(0, 0, f"Error: {str(e)}")
             return []
     
-    def _get_email_details(self, msg_id):
+    def _message_request(self, msg_id, light=False):
+        """
+        Build the messages().get request for an email
+        
+        Args:
+            msg_id (str): Gmail message ID
+            light (bool): Fetch only headers/labels/snippet, not the body
+            
+        Returns:
+            HttpRequest: Unexecuted Gmail API request
+        """
+        if light:
+            return self.service.users().messages().get(
+                userId='me',
+                id=msg_id,
+                format='metadata',
+                metadataHeaders=METADATA_HEADERS
+            )
+        
+        return self.service.users().messages().get(
+            userId='me',
+            id=msg_id,
+            format='full',
+            fields=FULL_MESSAGE_FIELDS
+        )
+    
+    def _get_email_details(self, msg_id, light=False):
         """
         Get detailed information for a specific email
         
         Args:
             msg_id (str): Gmail message ID
+            light (bool): Use the snippet as the body instead of fetching it
             
         Returns:
             dict: Email details including folder labels
         """
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=msg_id,
-                format='full'
-            ).execute()
+            message = self._message_request(msg_id, light).execute()
+            
+            return self._parse_message(message, light)
+            
+        except Exception as e:
+            print(f"Error getting email {msg_id}: {e}")
+            return None
+    
+    def _get_email_details_batch(self, msg_ids, light=False):
+        """
+        Get detailed information for several emails using batch HTTP requests
+        
+        Args:
+            msg_ids (list): Gmail message IDs
+            light (bool): Use snippets as the bodies instead of fetching them
+            
+        Returns:
+            list: Email details in msg_ids order (failed messages are skipped)
+        """
+        results = {}
+        
+        def collect(request_id, response, exception):
+            if exception is not None:
+                print(f"Error getting email {request_id}: {exception}")
+                return
+            
+            email_data = self._parse_message(response, light)
+            if email_data:
+                results[request_id] = email_data
+        
+        for start in range(0, len(msg_ids), config.DETAIL_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=collect)
+            
+            for msg_id in msg_ids[start:start + config.DETAIL_BATCH_SIZE]:
+                batch.add(self._message_request(msg_id, light), request_id=msg_id)
+            
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"Error executing batch request: {e}")
+        
+        return [results[msg_id] for msg_id in msg_ids if msg_id in results]
+    
+    def _parse_message(self, message, light=False):
+        """
+        Parse a Gmail API message resource
+        
+        Args:
+            message (dict): Message returned by messages().get()
+            light (bool): Take the body from the snippet (format='metadata')
+            
+        Returns:
+            dict: Email details including folder labels
+        """
+        get = message.get
+        msg_id = get('id')
+        
+        try:
+            payload = get('payload') or {}
+            
+            # Extract headers (one lookup table, first occurrence wins)
+            headers = {
+                header.get('name', '').lower(): header.get('value', '')
+                for header in reversed(payload.get('headers') or ())
+            }
+            subject = headers.get('subject')
+            sender = headers.get('from')
+            date = headers.get('date')
             
-            # Extract headers
-            headers = message['payload']['headers']
-            subject = self._get_header(headers, 'Subject')
-            sender = self._get_header(headers, 'From')
-            date = self._get_header(headers, 'Date')
+            snippet = get('snippet', '')
             
-            # Extract body
-            body = self._get_email_body(message['payload'])
+            if light:
+                # Snippet is an HTML-escaped extract of the body
+                body = html.unescape(snippet)
+            else:
+                # Extract body
+                body = self._get_email_body(payload)
             
             # Clean body text
             body_text = self._clean_body(body)
             
             # Extract labels/folders - CRITICAL FOR SPAM DETECTION
-            labels = message.get('labelIds', [])
+            labels = get('labelIds', [])
             folder_info = self._parse_labels(labels)
             
             return {
@@ -144,7 +264,7 @@ class GmailFetcher:
                 'sender': sender or '(Unknown)',
                 'date': date or '(Unknown Date)',
                 'body': body_text,
-                'snippet': message.get('snippet', ''),
+                'snippet': snippet,
                 'labels': labels,  # Raw Gmail labels
                 'folder': folder_info['primary_folder'],  # Main folder (INBOX, SPAM, etc.)
                 'is_spam_folder': folder_info['is_spam'],  # True if in SPAM folder
@@ -152,7 +272,7 @@ class GmailFetcher:
             }
             
         except Exception as e:
-            print(f"Error getting email {msg_id}: {e}")
+            print(f"Error parsing email {msg_id}: {e}")
             return None
     
     def _parse_labels(self, labels):
@@ -165,65 +285,33 @@ class GmailFetcher:
         Returns:
             dict: Parsed folder information
         """
-        folder_info = {
-            'primary_folder': 'INBOX',  # Default
-            'is_spam': False,
-            'categories': []
-        }
-        
         if not labels:
-            return folder_info
-        
-        # Check for SPAM folder - MOST IMPORTANT
-        if 'SPAM' in labels:
-            folder_info['primary_folder'] = 'SPAM'
-            folder_info['is_spam'] = True
-        elif 'INBOX' in labels:
-            folder_info['primary_folder'] = 'INBOX'
-        elif 'IMPORTANT' in labels:
-            folder_info['primary_folder'] = 'IMPORTANT'
-        elif 'SENT' in labels:
-            folder_info['primary_folder'] = 'SENT'
-        elif 'DRAFT' in labels:
-            folder_info['primary_folder'] = 'DRAFT'
-        
-        # Check for categories
-        for label in labels:
-            if label.startswith('CATEGORY_'):
-                category = label.replace('CATEGORY_', '')
-                folder_info['categories'].append(category)
-                
-                # If no primary folder set, use category
-                if folder_info['primary_folder'] == 'INBOX' and not 'INBOX' in labels:
-                    folder_info['primary_folder'] = category
+            return {
+                'primary_folder': 'INBOX',  # Default
+                'is_spam': False,
+                'categories': []
+            }
+        
+        label_set = frozenset(labels)
+        
+        # Categories (CATEGORY_PROMOTIONS -> PROMOTIONS)
+        prefix_len = len(self.CATEGORY_PREFIX)
+        categories = [label[prefix_len:] for label in labels if label.startswith(self.CATEGORY_PREFIX)]
+        
+        # First folder by priority (SPAM is the most important), otherwise
+        # the first category, otherwise INBOX
+        primary_folder = next((folder for folder in self.FOLDER_PRIORITY if folder in label_set), None)
+        if primary_folder is None:
+            primary_folder = categories[0] if categories else 'INBOX'
         
         # Legacy category labels
-        if 'PROMOTIONS' in labels:
-            folder_info['categories'].append('PROMOTIONS')
-        if 'SOCIAL' in labels:
-            folder_info['categories'].append('SOCIAL')
-        if 'FORUMS' in labels:
-            folder_info['categories'].append('FORUMS')
-        if 'UPDATES' in labels:
-            folder_info['categories'].append('UPDATES')
-        
-        return folder_info
-    
-    def _get_header(self, headers, name):
-        """
-        Extract header value by name
+        categories.extend(category for category in self.LEGACY_CATEGORIES if category in label_set)
         
-        Args:
-            headers (list): List of email headers
-            name (str): Header name to find
-            
-        Returns:
-            str: Header value or None
-        """
-        for header in headers:
-            if header['name'].lower() == name.lower():
-                return header['value']
-        return None
+        return {
+            'primary_folder': primary_folder,
+            'is_spam': primary_folder == 'SPAM',
+            'categories': categories
+        }
     
     def _get_email_body(self, payload):
         """
@@ -235,35 +323,36 @@ class GmailFetcher:
         Returns:
             str: Email body text
         """
-        body = ""
-        
-        if 'body' in payload and 'data' in payload['body']:
-            body = base64.urlsafe_b64decode(
-                payload['body']['data']
-            ).decode('utf-8', errors='ignore')
-        
-        elif 'parts' in payload:
-            for part in payload['parts']:
-                if part['mimeType'] == 'text/plain':
-                    if 'data' in part['body']:
-                        body = base64.urlsafe_b64decode(
-                            part['body']['data']
-                        ).decode('utf-8', errors='ignore')
-                        break
-                elif part['mimeType'] == 'text/html':
-                    if 'data' in part['body']:
-                        html = base64.urlsafe_b64decode(
-                            part['body']['data']
-                        ).decode('utf-8', errors='ignore')
-                        body = self._html_to_text(html)
-                        break
-                elif 'parts' in part:
-                    # Recursive for nested parts
-                    body = self._get_email_body(part)
-                    if body:
-                        break
-        
-        return body
+        # Iterative depth-first walk: the first text/plain part at any depth
+        # wins, HTML is only decoded and converted if there is none
+        stack = [payload]
+        html_data = None
+        
+        pop = stack.pop
+        extend = stack.extend
+        
+        while stack:
+            get = pop().get
+            
+            # Parts without data have no 'body' in the trimmed response
+            data = (get('body') or _EMPTY_BODY).get('data')
+            
+            if data:
+                mime_type = get('mimeType')
+                if mime_type == 'text/plain':
+                    return _decode_part_data(data)
+                if mime_type == 'text/html' and html_data is None:
+                    html_data = data
+            
+            # Reversed so parts are visited in document order
+            parts = get('parts')
+            if parts:
+                extend(reversed(parts))
+        
+        if html_data is not None:
+            return self._html_to_text(_decode_part_data(html_data))
+        
+        return ""
     
     def _html_to_text(self, html):
         """
@@ -276,8 +365,13 @@ class GmailFetcher:
             str: Plain text
         """
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            return soup.get_text()
+            # lxml's C parser, much faster than BeautifulSoup's html.parser
+            try:
+                return lxml.html.fromstring(html).text_content()
+            except ValueError:
+                # lxml refuses str input carrying an <?xml encoding=...?>
+                # declaration; the same markup parses fine as bytes
+                return lxml.html.fromstring(html.encode('utf-8')).text_content()
         except Exception:
             return html
     
@@ -294,18 +388,16 @@ class GmailFetcher:
         if not body:
             return ""
         
-        # Remove extra whitespace
-        body = re.sub(r'\s+', ' ', body)
-        
-        # Remove URLs (optional, but helps with spam detection)
-        body = re.sub(r'http\S+|www.\S+', '', body)
+        # Remove URLs first (optional, but helps with spam detection), then
+        # collapse the whitespace they leave behind in the same final pass
+        body = _URL_RE.sub('', body)
+        body = _WHITESPACE_RE.sub(' ', body)
         
         # Trim
-        body = body.strip()
-        
-        return body
+        return body.strip()
     
-    def get_email_text_for_classification(self, email_data):
+    @staticmethod
+    def get_email_text_for_classification(email_data):
         """
         Get combined text for spam classification
         
@@ -333,25 +425,11 @@ class GmailFetcher:
         Returns:
             dict: Statistics by folder
         """
-        stats = {
-            'total': len(emails),
-            'by_folder': {},
-            'spam_folder_count': 0,
-            'inbox_count': 0
-        }
+        by_folder = Counter(email.get('folder', 'UNKNOWN') for email in emails)
         
-        for email in emails:
-            folder = email.get('folder', 'UNKNOWN')
-            
-            if folder not in stats['by_folder']:
-                stats['by_folder'][folder] = 0
-            
-            stats['by_folder'][folder] += 1
-            
-            if email.get('is_spam_folder', False):
-                stats['spam_folder_count'] += 1
-            
-            if folder == 'INBOX':
-                stats['inbox_count'] += 1
-        
-        return stats
\ No newline at end of file
+        return {
+            'total': len(emails),
+            'by_folder': dict(by_folder),
+            'spam_folder_count': sum(1 for email in emails if email.get('is_spam_folder', False)),
+            'inbox_count': by_folder['INBOX']
+        }
\ No newline at end of file
@@ -3,18 +3,30 @@ Real-time Email Monitoring & Notification System
 Monitors Gmail for new spam and sends alerts
 """
 
-import time
+import hashlib
+import re
 import threading
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from plyer import notification
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import config
+
+# PhishingDetector only scores http(s) URLs, so text without one scores 0
+_PHISHING_PREFILTER_RE = re.compile(r'https?://')
+
 
 class EmailNotifier:
     """Monitors Gmail and sends notifications for spam/phishing"""
     
+    # Upper bound on remembered message ids used to skip re-alerting
+    SEEN_IDS_LIMIT = 10000
+    # Classification results remembered for repeated (bulk/campaign) bodies
+    RESULT_CACHE_SIZE = 2048
+    
     def __init__(self, gmail_service, predictor, phishing_detector, check_interval=300):
         """
         Initialize notifier
@@ -25,16 +37,25 @@ class EmailNotifier:
             phishing_detector: PhishingDetector instance
             check_interval: Seconds between checks (default 5 minutes)
         """
+        from gmail_fetch import GmailFetcher
+        
         self.gmail_service = gmail_service
+        self.fetcher = GmailFetcher(gmail_service)
         self.predictor = predictor
         self.phishing_detector = phishing_detector
         self.check_interval = check_interval
         
         self.is_running = False
         self.monitor_thread = None
+        self._stop = threading.Event()
         self.last_check_time = datetime.now()
+        self._seen_ids = OrderedDict()
+        self._result_cache = OrderedDict()
         
-        self.alert_queue = []
+        # Bounded so long-running monitoring cannot grow without limit;
+        # the lock guards it between the monitor thread and UI readers
+        self.alert_queue = deque(maxlen=config.MAX_ALERTS)
+        self._alert_lock = threading.Lock()
         self.notification_enabled = True
     
     def start_monitoring(self):
@@ -43,6 +64,7 @@ class EmailNotifier:
             return False, "Monitoring already running"
         
         self.is_running = True
+        self._stop.clear()
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitor_thread.start()
         
@@ -51,8 +73,9 @@ class EmailNotifier:
     def stop_monitoring(self):
         """Stop background monitoring"""
         self.is_running = False
+        self._stop.set()
         if self.monitor_thread:
-            self.monitor_thread.join(timeout=5)
+            self.monitor_thread.join(timeout=10)
         
         return True, "Monitoring stopped"
     
@@ -64,83 +87,125 @@ class EmailNotifier:
             except Exception as e:
                 print(f"Monitoring error: {e}")
             
-            # Wait for next check
-            time.sleep(self.check_interval)
+            # Wait for next check; wakes immediately when stopped
+            if self._stop.wait(self.check_interval):
+                break
     
     def _check_new_emails(self):
         """Check for new emails since last check"""
         try:
-            from gmail_fetch import GmailFetcher
-            
-            # Calculate time since last check
-            time_ago = datetime.now() - self.last_check_time
-            query = f'after:{int(time_ago.total_seconds())}s'
+            # Gmail's after: operator takes an absolute epoch timestamp;
+            # note the start time now so mail arriving mid-check is not lost
+            check_started = datetime.now()
+            query = f'after:{int(self.last_check_time.timestamp())} -in:trash'
             
-            # Fetch recent emails
+            # Fetch recent emails; list() leaves out SPAM (and TRASH, which the
+            # query still excludes) unless includeSpamTrash is set
             results = self.gmail_service.users().messages().list(
                 userId='me',
                 q=query,
-                maxResults=10
+                maxResults=10,
+                includeSpamTrash=True
             ).execute()
             
             messages = results.get('messages', [])
             
-            if not messages:
-                return
-            
-            # Analyze each new email
-            fetcher = GmailFetcher(self.gmail_service)
-            
+            # Analyze each new email, skipping ones already seen; the
+            # second-granularity window overlaps consecutive checks.
+            # The snippet is enough text for alerting, so skip the body
             for msg in messages:
-                email_data = fetcher._get_email_details(msg['id'])
+                if self._was_seen(msg['id']):
+                    continue
+                
+                email_data = self.fetcher._get_email_details(msg['id'], light=True)
                 
+                # Only remember it once analyzed, so a failed fetch is retried
                 if email_data:
                     self._analyze_and_notify(email_data)
+                    self._mark_seen(msg['id'])
             
             # Update last check time
-            self.last_check_time = datetime.now()
+            self.last_check_time = check_started
             
         except Exception as e:
             print(f"Error checking emails: {e}")
     
+    def _was_seen(self, msg_id):
+        """Check whether a message id was already analyzed"""
+        if msg_id in self._seen_ids:
+            self._seen_ids.move_to_end(msg_id)
+            return True
+        return False
+    
+    def _mark_seen(self, msg_id):
+        """Remember an analyzed message id, dropping the oldest past the limit"""
+        self._seen_ids[msg_id] = None
+        if len(self._seen_ids) > self.SEEN_IDS_LIMIT:
+            self._seen_ids.popitem(last=False)
+    
     def _analyze_and_notify(self, email_data):
         """Analyze email and send notification if needed"""
-        from gmail_fetch import GmailFetcher
+        # Gmail already filed it as spam; alert without re-classifying
+        if email_data.get('is_spam_folder'):
+            self._queue_alert(email_data, 'spam', 100.0, 0)
+            return
         
         # Get email text
-        fetcher = GmailFetcher(self.gmail_service)
-        email_text = fetcher.get_email_text_for_classification(email_data)
+        email_text = self.fetcher.get_email_text_for_classification(email_data)
         
-        # Spam prediction
-        prediction, confidence = self.predictor.predict(email_text)
-        
-        # Phishing detection
-        phishing_result = self.phishing_detector.analyze_email(email_text)
+        prediction, confidence, phishing_score = self._classify(email_text)
         
         # Check if notification needed
-        should_notify = False
         alert_type = None
         
         if prediction == 'spam' and confidence >= 80:
-            should_notify = True
             alert_type = 'spam'
         
-        if phishing_result['phishing_score'] >= 70:
-            should_notify = True
+        if phishing_score >= 70:
             alert_type = 'phishing'
         
-        if should_notify:
-            alert = {
-                'timestamp': datetime.now(),
-                'subject': email_data['subject'],
-                'sender': email_data['sender'],
-                'type': alert_type,
-                'spam_confidence': confidence,
-                'phishing_score': phishing_result['phishing_score']
-            }
-            
+        if alert_type:
+            self._queue_alert(email_data, alert_type, confidence, phishing_score)
+    
+    def _classify(self, email_text):
+        """Spam prediction and phishing score, memoized on a digest of the text"""
+        key = hashlib.blake2b(email_text.encode('utf-8', 'ignore'), digest_size=16).digest()
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            self._result_cache.move_to_end(key)
+            return cached
+        
+        # Spam prediction
+        prediction, confidence = self.predictor.predict(email_text)
+        
+        # Phishing detection, skipped when there is no URL to score
+        phishing_score = 0
+        if _PHISHING_PREFILTER_RE.search(email_text):
+            phishing_score = self.phishing_detector.analyze_email(email_text)['phishing_score']
+        
+        result = (prediction, confidence, phishing_score)
+        
+        # Don't remember failed predictions so they are retried next time
+        if prediction is not None:
+            self._result_cache[key] = result
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
+    
+    def _queue_alert(self, email_data, alert_type, spam_confidence, phishing_score):
+        """Record an alert and send its notification"""
+        alert = {
+            'timestamp': datetime.now(),
+            'subject': email_data['subject'],
+            'sender': email_data['sender'],
+            'type': alert_type,
+            'spam_confidence': spam_confidence,
+            'phishing_score': phishing_score
+        }
+        
+        with self._alert_lock:
             self.alert_queue.append(alert)
-            self._send_notification(alert)
+        self._send_notification(alert)
     
     def _send_notification(self, alert):
         """Send desktop notification"""
@@ -166,11 +231,13 @@ class EmailNotifier:
     
     def get_recent_alerts(self, limit=10):
         """Get recent alerts"""
-        return self.alert_queue[-limit:] if len(self.alert_queue) > 0 else []
+        with self._alert_lock:
+            return list(self.alert_queue)[-limit:]
     
     def clear_alerts(self):
         """Clear alert queue"""
-        self.alert_queue = []
+        with self._alert_lock:
+            self.alert_queue.clear()
     
     def get_status(self):
         """Get monitoring status"""
@@ -4,36 +4,61 @@ Analyzes URLs and email content for phishing indicators
 """
 
 import re
-from urllib.parse import urlparse
+from functools import lru_cache
+from urllib.parse import urlsplit
 import tldextract
 
+# Optional: Aho-Corasick finds every brand in a domain in one pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# URL, host and domain patterns (compiled once at import)
+# The URL pattern is one character class: a single linear scan, no backtracking
+_URL_RE = re.compile(r'http[s]?://[a-zA-Z0-9$-_@.&+!*\\(),]+')
+_IP_RE = re.compile(r'^(\d{1,3}\.){3}\d{1,3}$')
+_DIGIT_RUN_RE = re.compile(r'[0-9]{4,}')
+
+# Offline extractor: uses the bundled public suffix list, never fetches it
+_tld_extract = tldextract.TLDExtract(suffix_list_urls=())
+
+
+@lru_cache(maxsize=4096)
+def _extract_domain(netloc):
+    """Split a URL's netloc into subdomain/domain/suffix (cached, hosts repeat a lot)"""
+    return _tld_extract(netloc)
+
 
 class PhishingDetector:
     """Detects phishing attempts in emails"""
     
     # Suspicious TLDs often used in phishing
-    SUSPICIOUS_TLDS = {
+    SUSPICIOUS_TLDS = frozenset({
         'tk', 'ml', 'ga', 'cf', 'gq', 'xyz', 'top', 'work', 'click',
         'link', 'download', 'racing', 'accountant', 'loan', 'win', 'bid'
-    }
+    })
     
     # URL shorteners
-    URL_SHORTENERS = {
+    URL_SHORTENERS = frozenset({
         'bit.ly', 'goo.gl', 'tinyurl.com', 'ow.ly', 't.co', 'is.gd',
         'buff.ly', 'adf.ly', 'short.link', 'cutt.ly', 'rb.gy'
-    }
+    })
     
     # Legitimate domains often impersonated
-    IMPERSONATED_DOMAINS = {
+    IMPERSONATED_DOMAINS = frozenset({
         'paypal', 'amazon', 'microsoft', 'google', 'apple', 'facebook',
         'netflix', 'instagram', 'linkedin', 'twitter', 'dropbox', 'adobe',
         'ebay', 'wellsfargo', 'chase', 'bankofamerica', 'irs', 'usps', 'fedex', 'dhl'
-    }
+    })
     
     def __init__(self):
-        self.url_pattern = re.compile(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        )
+        self._brand_automaton = None
+        if ahocorasick is not None:
+            self._brand_automaton = ahocorasick.Automaton()
+            for brand in self.IMPERSONATED_DOMAINS:
+                self._brand_automaton.add_word(brand, brand)
+            self._brand_automaton.make_automaton()
     
     def analyze_email(self, email_text, email_html=None):
         """
@@ -94,7 +119,7 @@ class PhishingDetector:
             'risk_level': risk_level,
             'url_count': len(urls),
             'suspicious_urls': suspicious_urls,
-            'indicators': list(set(indicators)),  # Remove duplicates
+            'indicators': list(dict.fromkeys(indicators)),  # Remove duplicates, keep order
             'explanation': explanation
         }
     
@@ -103,8 +128,8 @@ class PhishingDetector:
         if not text:
             return []
         
-        urls = self.url_pattern.findall(text)
-        return list(set(urls))  # Remove duplicates
+        urls = _URL_RE.findall(text)
+        return list(dict.fromkeys(urls))  # Remove duplicates, keep order
     
     def _analyze_url(self, url):
         """
@@ -117,40 +142,43 @@ class PhishingDetector:
         risk_score = 0
         
         try:
-            parsed = urlparse(url)
-            extracted = tldextract.extract(url)
+            parsed = urlsplit(url)
             
             # Check 1: IP address instead of domain
             if self._is_ip_address(parsed.netloc):
                 reasons.append('Uses IP address instead of domain name')
                 risk_score += 8
-            
-            # Check 2: Suspicious TLD
-            if extracted.suffix.lower() in self.SUSPICIOUS_TLDS:
-                reasons.append(f'Suspicious domain extension (.{extracted.suffix})')
-                risk_score += 6
-            
-            # Check 3: URL shortener
-            if extracted.domain in self.URL_SHORTENERS:
-                reasons.append('Uses URL shortener (hides real destination)')
-                risk_score += 7
-            
-            # Check 4: Excessive subdomains
-            subdomain_count = len(extracted.subdomain.split('.')) if extracted.subdomain else 0
-            if subdomain_count > 2:
-                reasons.append(f'Excessive subdomains ({subdomain_count})')
-                risk_score += 5
-            
-            # Check 5: Domain impersonation
-            for legit_domain in self.IMPERSONATED_DOMAINS:
-                if legit_domain in extracted.domain and extracted.domain != legit_domain:
-                    reasons.append(f'Possible impersonation of {legit_domain}')
-                    risk_score += 9
-            
-            # Check 6: Suspicious characters in domain
-            if re.search(r'[0-9]{4,}', extracted.domain):
-                reasons.append('Domain contains many numbers')
-                risk_score += 4
+            else:
+                # Domain checks 2-6 can never fire for a bare IP, so only
+                # real host names go through the suffix list
+                extracted = _extract_domain(parsed.netloc)
+                
+                # Check 2: Suspicious TLD
+                if extracted.suffix.lower() in self.SUSPICIOUS_TLDS:
+                    reasons.append(f'Suspicious domain extension (.{extracted.suffix})')
+                    risk_score += 6
+                
+                # Check 3: URL shortener
+                if extracted.domain in self.URL_SHORTENERS:
+                    reasons.append('Uses URL shortener (hides real destination)')
+                    risk_score += 7
+                
+                # Check 4: Excessive subdomains
+                subdomain_count = len(extracted.subdomain.split('.')) if extracted.subdomain else 0
+                if subdomain_count > 2:
+                    reasons.append(f'Excessive subdomains ({subdomain_count})')
+                    risk_score += 5
+                
+                # Check 5: Domain impersonation
+                for legit_domain in self._brands_in(extracted.domain):
+                    if extracted.domain != legit_domain:
+                        reasons.append(f'Possible impersonation of {legit_domain}')
+                        risk_score += 9
+                
+                # Check 6: Suspicious characters in domain
+                if _DIGIT_RUN_RE.search(extracted.domain):
+                    reasons.append('Domain contains many numbers')
+                    risk_score += 4
             
             # Check 7: Very long URL
             if len(url) > 150:
@@ -177,10 +205,16 @@ class PhishingDetector:
             'reasons': reasons
         }
     
+    def _brands_in(self, domain):
+        """Impersonated brands occurring anywhere in domain, each once"""
+        if self._brand_automaton is None:
+            return [brand for brand in self.IMPERSONATED_DOMAINS if brand in domain]
+        
+        return dict.fromkeys(brand for _, brand in self._brand_automaton.iter(domain))
+    
     def _is_ip_address(self, hostname):
         """Check if hostname is an IP address"""
-        ip_pattern = re.compile(r'^(\d{1,3}\.){3}\d{1,3}$')
-        return bool(ip_pattern.match(hostname.split(':')[0]))
+        return bool(_IP_RE.match(hostname.split(':')[0]))
     
     def _generate_explanation(self, score, indicators, url_count):
         """Generate human-readable explanation"""
@@ -3,14 +3,33 @@ Spam Prediction Wrapper
 Loads existing model and makes predictions
 """
 
-import pickle
 import re
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.pipeline import Pipeline
+from sklearn.utils import murmurhash3_32
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
 import nltk
 import os
+import threading
+import time
+from functools import cached_property, lru_cache
+from pathlib import Path
 import config
 
+# Written once the NLTK data has been found, so later starts skip the probes
+_NLTK_SENTINEL = Path.home() / '.spamclf_nltk_ok'
+
+# Everything except letters and whitespace is dropped before tokenizing
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+# Same deletion for pure-ASCII text, done by str.translate instead of the regex engine
+_NON_ALPHA_ASCII = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not (c.isalpha() or c.isspace())
+))
+
 
 class SpamPredictor:
     """Wrapper for spam prediction using trained model"""
@@ -25,22 +44,46 @@ class SpamPredictor:
         return self.model, self.vectorizer
     
     def __init__(self):
-        """Initialize predictor and load model"""
-        self.model = None
-        self.vectorizer = None
+        """Initialize predictor (stopwords and model are loaded on first use)"""
         self.stemmer = PorterStemmer()
-        
+        # PorterStemmer is pure Python and the token vocabulary is small: memoize stems
+        self._stem = lru_cache(maxsize=50000)(self.stemmer.stem)
+    
+    @cached_property
+    def stop_words(self):
+        """English stopwords, fetching NLTK data the first time they are needed"""
         # Download NLTK data FIRST - FIXED VERSION
         self._ensure_nltk_data()
         
         # Then load stopwords
-        self.stop_words = set(stopwords.words('english'))
-        
-        # Load model
+        try:
+            return set(stopwords.words('english'))
+        except LookupError:
+            # Data removed after the sentinel was written: probe and download again
+            _NLTK_SENTINEL.unlink(missing_ok=True)
+            self._ensure_nltk_data.cache_clear()
+            self._ensure_nltk_data()
+            return set(stopwords.words('english'))
+    
+    @cached_property
+    def model(self):
+        """Trained model, loaded with the vectorizer on first use (None if loading fails)"""
+        self.load_model()
+        return self.model
+    
+    @cached_property
+    def vectorizer(self):
+        """Fitted vectorizer, loaded with the model on first use (None if loading fails)"""
         self.load_model()
+        return self.vectorizer
     
-    def _ensure_nltk_data(self):
-        """Ensure NLTK data is downloaded - PRODUCTION FIX"""
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _ensure_nltk_data():
+        """Ensure NLTK data is downloaded - PRODUCTION FIX (once per process)"""
+        if _NLTK_SENTINEL.exists():
+            return
+        
         import ssl
         
         # Fix SSL certificate issues on cloud
@@ -74,6 +117,14 @@ class SpamPredictor:
                         print(f"✓ {name} downloaded to ~/nltk_data")
                     except Exception as e2:
                         print(f"✗ Failed to download {name}: {e2}")
+        
+        # Remember success so later process starts skip the probes
+        try:
+            for path in required_data.values():
+                nltk.data.find(path)
+            _NLTK_SENTINEL.touch()
+        except (LookupError, OSError):
+            pass
     
     def load_model(self):
         """Load trained model and vectorizer"""
@@ -84,17 +135,119 @@ class SpamPredictor:
             if not os.path.exists(config.VECTORIZER_FILE):
                 raise FileNotFoundError(f"Vectorizer not found at {config.VECTORIZER_FILE}")
             
-            with open(config.MODEL_FILE, 'rb') as f:
-                self.model = pickle.load(f)
+            # Memory-map the arrays (read-only) so forked workers share their pages
+            self.model = joblib.load(config.MODEL_FILE, mmap_mode='r')
+            self.vectorizer = joblib.load(config.VECTORIZER_FILE, mmap_mode='r')
             
-            with open(config.VECTORIZER_FILE, 'rb') as f:
-                self.vectorizer = pickle.load(f)
+            # Rebuilt for the new vectorizer on next use
+            self.__dict__.pop('_row_builder', None)
             
             return True, "Model loaded successfully"
             
         except Exception as e:
+            self.model = None
+            self.vectorizer = None
             return False, f"Error loading model: {str(e)}"
     
+    @cached_property
+    def _row_builder(self):
+        """
+        Pieces for building one TF-IDF row by hand, skipping transform()'s per-call overhead
+        
+        Returns:
+            tuple: (analyzer, term -> column or None, idf, n_features, dtype), or
+                   None if the vectorizer is not covered (use transform)
+        """
+        try:
+            return self._make_row_builder()
+        except Exception as e:
+            # e.g. pickles from older scikit-learn keep only _idf_diag, not idf_
+            print(f"Single-row fast path disabled, using vectorizer.transform: {e}")
+            return None
+    
+    def _make_row_builder(self):
+        """Collect the _row_builder pieces (raises if the vectorizer lacks them)"""
+        vectorizer = self.vectorizer
+        
+        if isinstance(vectorizer, TfidfVectorizer):
+            tfidf = vectorizer
+            if tfidf.binary:
+                return None
+            
+            analyzer = vectorizer.build_analyzer()
+            index_of = vectorizer.vocabulary_.get
+            n_features = len(vectorizer.vocabulary_)
+            dtype = vectorizer.dtype
+        
+        elif isinstance(vectorizer, Pipeline) and len(vectorizer.steps) == 2:
+            hasher, tfidf = vectorizer.steps[0][1], vectorizer.steps[1][1]
+            if (not isinstance(hasher, HashingVectorizer) or hasher.binary
+                    or hasher.alternate_sign or hasher.norm is not None):
+                return None
+            
+            analyzer = hasher.build_analyzer()
+            n_features = hasher.n_features
+            dtype = hasher.dtype
+            
+            # Same column as HashingVectorizer (signed murmurhash3, abs modulo n_features)
+            @lru_cache(maxsize=50000)
+            def index_of(term):
+                h = murmurhash3_32(term, seed=0)
+                if h == -2147483648:
+                    return (2147483647 - (n_features - 1)) % n_features
+                return abs(h) % n_features
+        
+        else:
+            return None
+        
+        if tfidf.sublinear_tf or not tfidf.use_idf or tfidf.norm != 'l2':
+            return None
+        
+        # TfidfTransformer keeps float32 input as float32, anything else becomes float64
+        dtype = np.float32 if np.dtype(dtype) == np.float32 else np.float64
+        
+        idf = np.asarray(tfidf.idf_, dtype=dtype)
+        if idf.shape != (n_features,):
+            return None
+        
+        return analyzer, index_of, idf, n_features, dtype
+    
+    def _tfidf_row(self, processed_text):
+        """TF-IDF vector (1 x n_features CSR) of one preprocessed text"""
+        builder = self._row_builder
+        if builder is None:
+            return self.vectorizer.transform([processed_text])
+        
+        try:
+            return self._build_row(processed_text, *builder)
+        except Exception as e:
+            print(f"Single-row fast path failed, using vectorizer.transform: {e}")
+            self._row_builder = None
+            return self.vectorizer.transform([processed_text])
+    
+    @staticmethod
+    def _build_row(processed_text, analyzer, index_of, idf, n_features, dtype):
+        """Count terms, weight by idf and L2-normalize into a 1 x n_features CSR row"""
+        
+        # Term counts per column
+        counts = {}
+        for term in analyzer(processed_text):
+            column = index_of(term)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        
+        columns = sorted(counts)
+        indices = np.array(columns, dtype=np.int32)
+        data = np.array([counts[column] for column in columns], dtype=dtype) * idf[indices]
+        
+        # L2-normalize like TfidfTransformer
+        norm = np.sqrt(np.dot(data, data))
+        if norm > 0:
+            data /= norm
+        
+        return csr_matrix((data, indices, np.array([0, len(columns)], dtype=np.int32)),
+                          shape=(1, n_features))
+    
     def preprocess_text(self, text):
         """
         Preprocess text for prediction (same as training)
@@ -112,23 +265,24 @@ class SpamPredictor:
         text = text.lower()
         
         # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Tokenize and remove stopwords
-        words = text.split()
-        words = [word for word in words if word not in self.stop_words]
-        
-        # Stem words
-        words = [self.stemmer.stem(word) for word in words]
+        if text.isascii():
+            text = text.translate(_NON_ALPHA_ASCII)
+        else:
+            text = _NON_ALPHA_RE.sub('', text)
         
-        return ' '.join(words)
+        # Tokenize, remove stopwords and stem words in one pass
+        stop_words = self.stop_words
+        stem = self._stem
+        return ' '.join([stem(word) for word in text.split() if word not in stop_words])
     
-    def predict(self, text):
+    def predict(self, text, processed_text=None):
         """
         Predict if text is spam or ham
         
         Args:
             text (str): Input text
+            processed_text (str): Output of preprocess_text(text), if the
+                                  caller already computed it (optional)
             
         Returns:
             tuple: (prediction, confidence)
@@ -138,24 +292,22 @@ class SpamPredictor:
         
         try:
             # Preprocess
-            processed_text = self.preprocess_text(text)
+            if processed_text is None:
+                processed_text = self.preprocess_text(text)
             
             if not processed_text:
                 # Empty text after preprocessing
                 return 'ham', 50.0
             
             # Vectorize
-            text_tfidf = self.vectorizer.transform([processed_text])
+            text_tfidf = self._tfidf_row(processed_text)
             
-            # Predict
-            prediction = self.model.predict(text_tfidf)[0]
-            probabilities = self.model.predict_proba(text_tfidf)[0]
+            # Predict: one log-probability pass gives both class and confidence
+            log_probabilities = self.model.predict_log_proba(text_tfidf)[0]
+            best = int(np.argmax(log_probabilities))
             
-            # Get confidence
-            if prediction == 'spam':
-                confidence = probabilities[1] * 100
-            else:
-                confidence = probabilities[0] * 100
+            prediction = self.model.classes_[best]
+            confidence = float(np.exp(log_probabilities[best]) * 100)
             
             return prediction, confidence
             
@@ -163,22 +315,174 @@ class SpamPredictor:
             print(f"Prediction error: {e}")
             return None, 0.0
     
-    def predict_batch(self, texts):
+    def predict_batch(self, texts, processed_texts=None):
         """
         Predict multiple texts at once
         
         Args:
             texts (list): List of text strings
+            processed_texts (list): Preprocessed version of each text, or
+                                    None entries to preprocess here (optional)
             
         Returns:
             list: List of (prediction, confidence) tuples
         """
-        results = []
-        for text in texts:
-            pred, conf = self.predict(text)
-            results.append((pred, conf))
-        return results
+        if not self.model or not self.vectorizer:
+            return [(None, 0.0)] * len(texts)
+        
+        if processed_texts is None:
+            processed_texts = [None] * len(texts)
+        
+        try:
+            # Preprocess
+            processed_texts = [
+                self.preprocess_text(text) if processed_text is None else processed_text
+                for text, processed_text in zip(texts, processed_texts)
+            ]
+            
+            # Empty text after preprocessing is 'ham' at 50%, like predict()
+            results = [('ham', 50.0)] * len(texts)
+            rows = [i for i, processed_text in enumerate(processed_texts) if processed_text]
+            if not rows:
+                return results
+            
+            # Vectorize and predict every remaining text in one call
+            text_tfidf = self.vectorizer.transform([processed_texts[i] for i in rows])
+            log_probabilities = self.model.predict_log_proba(text_tfidf)
+            
+            best = log_probabilities.argmax(axis=1)
+            predictions = self.model.classes_[best].tolist()
+            confidences = (np.exp(log_probabilities[np.arange(len(rows)), best]) * 100).tolist()
+            
+            for i, prediction, confidence in zip(rows, predictions, confidences):
+                results[i] = (prediction, confidence)
+            return results
+            
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            return [(None, 0.0)] * len(texts)
     
     def is_loaded(self):
         """Check if model is loaded"""
-        return self.model is not None and self.vectorizer is not None
\ No newline at end of file
+        return self.model is not None and self.vectorizer is not None
+
+
+class _PendingPrediction:
+    """A single queued prediction waiting for its batch to run"""
+
+    def __init__(self, text, processed_text):
+        self.text = text
+        self.processed_text = processed_text
+        self.queued_at = time.monotonic()
+        self.result = (None, 0.0)
+        self.done = False
+
+
+class BatchPredictor:
+    """
+    Groups concurrent predict() calls from different threads (e.g. Streamlit
+    sessions) into a single SpamPredictor.predict_batch() call
+    """
+
+    def __init__(self, predictor, batch_size=16, max_wait_ms=10):
+        """
+        Initialize batching wrapper
+        
+        Args:
+            predictor: SpamPredictor instance
+            batch_size (int): Maximum requests per batch
+            max_wait_ms (int): Longest time a request waits for others to join
+        """
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        
+        self._pending = []
+        self._has_leader = False
+        self._in_flight = 0
+        self._cond = threading.Condition()
+    
+    def predict(self, text, processed_text=None):
+        """
+        Predict if text is spam or ham, batched with concurrent callers
+        
+        Args:
+            text (str): Input text
+            processed_text (str): Output of preprocess_text(text) (optional)
+            
+        Returns:
+            tuple: (prediction, confidence)
+        """
+        with self._cond:
+            # Nothing else running: predict right away instead of waiting
+            # for a batch that nobody else will join
+            direct = not (self._has_leader or self._pending or self._in_flight)
+            if direct:
+                self._in_flight += 1
+        
+        if direct:
+            try:
+                return self.predictor.predict(text, processed_text)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+        
+        request = _PendingPrediction(text, processed_text)
+        
+        with self._cond:
+            self._pending.append(request)
+            # Wake the leader once its batch is full
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+            
+            # Wait for a leader to serve this request, or take over leading
+            while not request.done:
+                if not self._has_leader:
+                    self._has_leader = True
+                    break
+                self._cond.wait()
+        
+        if not request.done:
+            self._run_batch(request)
+        
+        return request.result
+    
+    def _run_batch(self, own):
+        """Predict queued batches (oldest first) until the leader's own request is done"""
+        try:
+            while True:
+                with self._cond:
+                    # Requests wait at most max_wait from when they were queued
+                    deadline = self._pending[0].queued_at + self.max_wait
+                    while len(self._pending) < self.batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                
+                try:
+                    results = self.predictor.predict_batch(
+                        [r.text for r in batch],
+                        [r.processed_text for r in batch]
+                    )
+                except Exception as e:
+                    print(f"Batch prediction error: {e}")
+                    results = []
+                
+                with self._cond:
+                    for request, result in zip(batch, results):
+                        request.result = result
+                    for request in batch:
+                        request.done = True
+                    self._cond.notify_all()
+                    
+                    if own.done:
+                        return
+        finally:
+            # Hand leadership to a waiting request, if any
+            with self._cond:
+                self._has_leader = False
+                self._cond.notify_all()
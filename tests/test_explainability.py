@@ -0,0 +1,71 @@
+"""
+Tests for SpamExplainer on the hashed training pipeline
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from explainability import SpamExplainer
+from predictor import SpamPredictor
+
+
+class TestHashedExplanation(unittest.TestCase):
+    
+    MESSAGES = [
+        ("Congratulations! You have won a free prize, claim your cash now", 1),
+        ("Free entry in the weekly competition, text WIN to claim", 1),
+        ("Are we still meeting for lunch tomorrow?", 0),
+        ("I will call you later about the meeting", 0),
+    ]
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.predictor = SpamPredictor()
+        processed = [cls.predictor.preprocess_text(text) for text, _ in cls.MESSAGES]
+        labels = [label for _, label in cls.MESSAGES]
+        
+        vectorizer = Pipeline([
+            ('hash', HashingVectorizer(n_features=2**10, alternate_sign=False, norm=None,
+                                       dtype=np.float32)),
+            ('tfidf', TfidfTransformer())
+        ])
+        model = MultinomialNB().fit(vectorizer.fit_transform(processed), labels)
+        cls.explainer = SpamExplainer(model, vectorizer)
+    
+    def test_explains_preprocessed_words(self):
+        text = "Congratulations, your FREE prize is waiting, claim it at the 2 shops"
+        processed_text = self.predictor.preprocess_text(text)
+        
+        explanation = self.explainer.explain_prediction(text, 'spam', 95.0,
+                                                        processed_text=processed_text)
+        
+        words = {feature['word'] for feature in explanation['top_features']}
+        self.assertTrue(words)
+        self.assertLessEqual(words, set(processed_text.split()))
+        self.assertNotIn('your', words)
+        self.assertNotIn('the', words)
+        self.assertNotIn('congratulations', words)
+    
+    def test_batch_matches_single(self):
+        texts = [text for text, _ in self.MESSAGES]
+        processed_texts = [self.predictor.preprocess_text(text) for text in texts]
+        
+        batch = self.explainer.explain_batch(texts, ['spam'] * len(texts), [90.0] * len(texts),
+                                             processed_texts=processed_texts)
+        single = [
+            self.explainer.explain_prediction(text, 'spam', 90.0, processed_text=processed_text)
+            for text, processed_text in zip(texts, processed_texts)
+        ]
+        self.assertEqual(batch, single)
+
+
+if __name__ == '__main__':
+    unittest.main()
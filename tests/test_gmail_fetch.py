@@ -0,0 +1,35 @@
+"""
+Tests for GmailFetcher's HTML body handling
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gmail_fetch import GmailFetcher
+
+
+class TestHtmlToText(unittest.TestCase):
+    
+    def setUp(self):
+        self.fetcher = GmailFetcher(None)
+    
+    def test_plain_html(self):
+        text = self.fetcher._html_to_text('<html><body><p>Hello <b>there</b></p></body></html>')
+        self.assertEqual(text.strip(), 'Hello there')
+    
+    def test_xml_encoding_declaration(self):
+        html = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<html><body><p>Claim your prémio now</p></body></html>')
+        text = self.fetcher._html_to_text(html)
+        self.assertEqual(text.strip(), 'Claim your prémio now')
+        self.assertNotIn('<', text)
+    
+    def test_empty_document(self):
+        self.assertEqual(self.fetcher._html_to_text(''), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests for EmailNotifier's polling against a fake Gmail service
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from notifier import EmailNotifier
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+    
+    def execute(self):
+        return self.result
+
+
+class _FakeMessages:
+    """messages() resource that, like Gmail, hides SPAM unless includeSpamTrash is set"""
+    
+    def __init__(self, messages):
+        self.messages = messages
+        self.failures = set()
+        self.get_calls = 0
+    
+    def list(self, userId, q, maxResults, includeSpamTrash=False, **kwargs):
+        found = [
+            {'id': msg['id']} for msg in self.messages
+            if includeSpamTrash or 'SPAM' not in msg['labelIds']
+        ]
+        return _Request({'messages': found[:maxResults]})
+    
+    def get(self, userId, id, **kwargs):
+        self.get_calls += 1
+        if id in self.failures:
+            # One transient API error per listed id
+            self.failures.discard(id)
+            raise ConnectionError('transient API error')
+        return _Request(next(msg for msg in self.messages if msg['id'] == id))
+
+
+class _FakeService:
+    def __init__(self, messages):
+        self._messages = _FakeMessages(messages)
+    
+    def users(self):
+        return self
+    
+    def messages(self):
+        return self._messages
+
+
+class _HamPredictor:
+    def predict(self, text):
+        return 'ham', 90.0
+
+
+class _NoPhishing:
+    def analyze_email(self, text):
+        return {'phishing_score': 0}
+
+
+def _message(msg_id, labels, subject):
+    return {
+        'id': msg_id,
+        'labelIds': labels,
+        'snippet': 'Lunch tomorrow?',
+        'payload': {'headers': [
+            {'name': 'Subject', 'value': subject},
+            {'name': 'From', 'value': 'someone@example.com'},
+        ]},
+    }
+
+
+class TestCheckNewEmails(unittest.TestCase):
+    
+    def test_spam_folder_message_alerts(self):
+        service = _FakeService([
+            _message('m1', ['INBOX'], 'Lunch'),
+            _message('m2', ['SPAM'], 'You won'),
+        ])
+        notifier = EmailNotifier(service, _HamPredictor(), _NoPhishing())
+        notifier.notification_enabled = False
+        
+        notifier._check_new_emails()
+        
+        alerts = notifier.get_recent_alerts()
+        self.assertEqual([alert['subject'] for alert in alerts], ['You won'])
+        self.assertEqual(alerts[0]['type'], 'spam')
+        self.assertEqual(alerts[0]['spam_confidence'], 100.0)
+    
+    def test_failed_fetch_is_retried(self):
+        service = _FakeService([_message('m1', ['SPAM'], 'You won')])
+        service._messages.failures.add('m1')
+        notifier = EmailNotifier(service, _HamPredictor(), _NoPhishing())
+        notifier.notification_enabled = False
+        
+        notifier._check_new_emails()
+        self.assertEqual(notifier.get_recent_alerts(), [])
+        
+        notifier._check_new_emails()
+        self.assertEqual(len(notifier.get_recent_alerts()), 1)
+        self.assertEqual(service._messages.get_calls, 2)
+    
+    def test_analyzed_message_is_not_repeated(self):
+        service = _FakeService([_message('m1', ['SPAM'], 'You won')])
+        notifier = EmailNotifier(service, _HamPredictor(), _NoPhishing())
+        notifier.notification_enabled = False
+        
+        notifier._check_new_emails()
+        notifier._check_new_emails()
+        
+        self.assertEqual(len(notifier.get_recent_alerts()), 1)
+        self.assertEqual(service._messages.get_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for SpamPredictor and BatchPredictor
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import Pipeline
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from predictor import BatchPredictor, SpamPredictor
+
+
+class TestCheckedInModel(unittest.TestCase):
+    """predict() must work on models/*.pkl whatever scikit-learn unpickles them"""
+    
+    TEXTS = [
+        "WIN a FREE prize now, claim your cash reward",
+        "Are we still meeting for lunch tomorrow?",
+        "URGENT! Your mobile number has been awarded a 2000 pound bonus",
+    ]
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.predictor = SpamPredictor()
+        if not cls.predictor.is_loaded():
+            raise unittest.SkipTest("models/*.pkl could not be loaded")
+    
+    def test_predict_returns_label(self):
+        for text in self.TEXTS:
+            prediction, confidence = self.predictor.predict(text)
+            self.assertIn(prediction, ('spam', 'ham'), text)
+            self.assertGreaterEqual(confidence, 50.0)
+    
+    def test_predict_matches_batch(self):
+        for (single_label, single_conf), (batch_label, batch_conf) in zip(
+                [self.predictor.predict(text) for text in self.TEXTS],
+                self.predictor.predict_batch(self.TEXTS)):
+            self.assertEqual(single_label, batch_label)
+            self.assertAlmostEqual(single_conf, batch_conf, places=4)
+
+
+class TestRowBuilder(unittest.TestCase):
+    """The hand-built single row must equal vectorizer.transform() for each supported vectorizer"""
+    
+    CORPUS = [
+        "win free prize claim cash reward",
+        "still meet lunch tomorrow",
+        "urgent mobil number award pound bonu",
+        "free entri weekli competit win cup final",
+        "call later meet lunch",
+    ]
+    TEXTS = CORPUS + ["free free win lunch", "unseen word onli", "win"]
+    
+    def assert_rows_match(self, vectorizer, dtype):
+        predictor = SpamPredictor()
+        predictor.vectorizer = vectorizer.fit(self.CORPUS)
+        self.assertIsNotNone(predictor._row_builder)
+        
+        for text in self.TEXTS:
+            row = predictor._tfidf_row(text)
+            expected = vectorizer.transform([text]).tocsr()
+            row.sort_indices()
+            expected.sort_indices()
+            
+            self.assertEqual(row.shape, expected.shape, text)
+            self.assertEqual(row.dtype, dtype, text)
+            self.assertEqual(row.dtype, expected.dtype, text)
+            np.testing.assert_array_equal(row.indices, expected.indices, err_msg=text)
+            np.testing.assert_allclose(row.data, expected.data, rtol=1e-6, err_msg=text)
+    
+    def test_tfidf_vectorizer(self):
+        self.assert_rows_match(TfidfVectorizer(max_features=3000), np.float64)
+    
+    def test_hashing_pipeline(self):
+        self.assert_rows_match(Pipeline([
+            ('hash', HashingVectorizer(n_features=2**10, alternate_sign=False, norm=None,
+                                       dtype=np.float32)),
+            ('tfidf', TfidfTransformer())
+        ]), np.float32)
+    
+    def test_hashing_pipeline_float64(self):
+        self.assert_rows_match(Pipeline([
+            ('hash', HashingVectorizer(n_features=2**10, alternate_sign=False, norm=None)),
+            ('tfidf', TfidfTransformer())
+        ]), np.float64)
+    
+    def test_unsupported_vectorizer_uses_transform(self):
+        predictor = SpamPredictor()
+        predictor.vectorizer = TfidfVectorizer(sublinear_tf=True).fit(self.CORPUS)
+        self.assertIsNone(predictor._row_builder)
+        
+        row = predictor._tfidf_row(self.TEXTS[5]).toarray()
+        expected = predictor.vectorizer.transform([self.TEXTS[5]]).toarray()
+        np.testing.assert_array_equal(row, expected)
+
+
+class _EchoPredictor:
+    """Stand-in SpamPredictor that labels each text with itself"""
+    
+    def __init__(self):
+        self.single_calls = 0
+        self.batch_sizes = []
+    
+    def predict(self, text, processed_text=None):
+        self.single_calls += 1
+        return text, 100.0
+    
+    def predict_batch(self, texts, processed_texts=None):
+        self.batch_sizes.append(len(texts))
+        time.sleep(0.002)
+        return [(text, 100.0) for text in texts]
+
+
+class TestBatchPredictor(unittest.TestCase):
+    
+    def test_lone_request_skips_batching(self):
+        predictor = _EchoPredictor()
+        batcher = BatchPredictor(predictor, max_wait_ms=1000)
+        
+        started = time.monotonic()
+        self.assertEqual(batcher.predict('hello'), ('hello', 100.0))
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(predictor.single_calls, 1)
+        self.assertEqual(predictor.batch_sizes, [])
+    
+    def test_concurrent_requests_get_their_own_results(self):
+        predictor = _EchoPredictor()
+        batcher = BatchPredictor(predictor, batch_size=8, max_wait_ms=5)
+        wrong = []
+        
+        def worker(worker_id):
+            for i in range(50):
+                text = f'{worker_id}-{i}'
+                if batcher.predict(text) != (text, 100.0):
+                    wrong.append(text)
+        
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(wrong, [])
+        self.assertEqual(predictor.single_calls + sum(predictor.batch_sizes), 12 * 50)
+        self.assertTrue(all(size <= 8 for size in predictor.batch_sizes))
+        self.assertEqual(batcher._pending, [])
+        self.assertFalse(batcher._has_leader)
+
+
+if __name__ == '__main__':
+    unittest.main()
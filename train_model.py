@@ -5,10 +5,13 @@ This script trains a Naive Bayes classifier on spam/ham email data
 
 import pandas as pd
 import numpy as np
-import pickle
+import copy
+import joblib
 import re
+from functools import lru_cache
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 import nltk
@@ -22,15 +25,29 @@ print("Downloading NLTK resources...")
 nltk.download('stopwords', quiet=True)
 nltk.download('punkt', quiet=True)
 
+# Everything except letters and whitespace is dropped before tokenizing
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+# Same deletion for pure-ASCII text, done by str.translate instead of the regex engine
+_NON_ALPHA_ASCII = str.maketrans('', '', ''.join(
+    c for c in map(chr, range(128)) if not (c.isalpha() or c.isspace())
+))
+
 class SpamClassifier:
     """
     A spam email classifier using Naive Bayes algorithm
     """
     
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=3000)
+        # Stateless hashing (no vocabulary to store or look up) + learned IDF
+        self.vectorizer = Pipeline([
+            ('hash', HashingVectorizer(n_features=2**14, alternate_sign=False, norm=None,
+                                      dtype=np.float32)),
+            ('tfidf', TfidfTransformer())
+        ])
         self.model = MultinomialNB()
         self.stemmer = PorterStemmer()
+        # PorterStemmer is pure Python and the token vocabulary is small: memoize stems
+        self._stem = lru_cache(maxsize=50000)(self.stemmer.stem)
         self.stop_words = set(stopwords.words('english'))
         
     def preprocess_text(self, text):
@@ -51,16 +68,15 @@ class SpamClassifier:
         text = text.lower()
         
         # Remove special characters and numbers
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
-        
-        # Tokenize and remove stopwords
-        words = text.split()
-        words = [word for word in words if word not in self.stop_words]
-        
-        # Stem words
-        words = [self.stemmer.stem(word) for word in words]
-        
-        return ' '.join(words)
+        if text.isascii():
+            text = text.translate(_NON_ALPHA_ASCII)
+        else:
+            text = _NON_ALPHA_RE.sub('', text)
+        
+        # Tokenize, remove stopwords and stem words in one pass
+        stop_words = self.stop_words
+        stem = self._stem
+        return ' '.join([stem(word) for word in text.split() if word not in stop_words])
     
     def load_data(self, filepath):
         """
@@ -123,6 +139,11 @@ class SpamClassifier:
         print("Training Naive Bayes classifier...")
         self.model.fit(X_train_tfidf, y_train)
         
+        # The features are float32 (TfidfTransformer keeps the hasher's dtype);
+        # match them so predicting needs no upcast and the accuracy below is what ships
+        self.model.feature_log_prob_ = self.model.feature_log_prob_.astype(np.float32)
+        self.model.class_log_prior_ = self.model.class_log_prior_.astype(np.float32)
+        
         # Make predictions
         y_train_pred = self.model.predict(X_train_tfidf)
         y_test_pred = self.model.predict(X_test_tfidf)
@@ -205,13 +226,17 @@ class SpamClassifier:
             vectorizer_path (str): Path to save the vectorizer
             model_path (str): Path to save the model
         """
+        # Uncompressed joblib files with float32 weights, so SpamPredictor
+        # can memory-map the arrays and use them without a converted copy.
+        # The raw counts are only needed to keep fitting, so leave them out
+        model = copy.copy(self.model)
+        del model.feature_count_, model.class_count_
+        
         print(f"\nSaving model to '{model_path}'...")
-        with open(model_path, 'wb') as f:
-            pickle.dump(self.model, f)
+        joblib.dump(model, model_path)
         
         print(f"Saving vectorizer to '{vectorizer_path}'...")
-        with open(vectorizer_path, 'wb') as f:
-            pickle.dump(self.vectorizer, f)
+        joblib.dump(self.vectorizer, vectorizer_path)
         
         print("Model and vectorizer saved successfully!")
     
@@ -225,12 +250,10 @@ class SpamClassifier:
             model_path (str): Path to the model file
         """
         print(f"Loading model from '{model_path}'...")
-        with open(model_path, 'rb') as f:
-            self.model = pickle.load(f)
+        self.model = joblib.load(model_path)
         
         print(f"Loading vectorizer from '{vectorizer_path}'...")
-        with open(vectorizer_path, 'rb') as f:
-            self.vectorizer = pickle.load(f)
+        self.vectorizer = joblib.load(vectorizer_path)
         
         print("Model and vectorizer loaded successfully!")
 